@@ -6,16 +6,22 @@ the entire synth driver (including this module) runs inside NVDA's built-in
 """
 from __future__ import annotations
 
+import codecs
 import ctypes
+import inspect
 import logging
 import os
-import queue
 import threading
-import time
-from typing import Any, Callable, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 LOGGER = logging.getLogger(__name__)
 
+# The add-on layout is fixed, so resolve these once at import rather than on
+# every check() during NVDA's synth enumeration.
+_ADDON_DIR = os.path.abspath(os.path.dirname(__file__))
+_WRAPPER_DLL = os.path.join(_ADDON_DIR, "eloquence_wrapper.dll")
+_ENGINE_DLL_NAME = "eci32d.dll"
+
 # Stream item types from eloquence_wrapper.cpp
 ELOQ_ITEM_NONE = 0
 ELOQ_ITEM_AUDIO = 1
@@ -23,6 +29,15 @@ ELOQ_ITEM_INDEX = 2
 ELOQ_ITEM_DONE = 3
 ELOQ_ITEM_ERROR = 4
 
+# Audio slices that arrive back to back are gathered in the read buffer and
+# handed to the player once this many bytes are pending (or the stream
+# pauses / a non-audio item arrives), instead of one feed per slice.
+_COALESCE_BYTES = 8192
+
+# How long eloq_read_wait() blocks before returning ELOQ_ITEM_NONE so the
+# read loop can re-check for a stop request.
+_READ_WAIT_MS = 100
+
 # ECI voice param IDs
 HSZ = 1
 PITCH = 2
@@ -35,101 +50,192 @@ VLM = 7
 # DLL functions safe to call from Python
 _ALLOWED_DLL_CALLS = frozenset({
 	"eloq_set_vparam", "eloq_set_variant", "eloq_set_voice",
-	"eloq_load_dict", "eloq_get_vparam",
+	"eloq_load_dict", "eloq_get_vparam", "eloq_apply_state",
 	"eloq_set_rate_boost", "eloq_get_rate_boost",
 })
 
 AudioChunk = Tuple[bytes, Optional[Any], bool, int]
 
+_cp1252_encode = codecs.getencoder("cp1252")
+
+
+def _feeds_pointer(nvwave, player) -> bool:
+	"""Whether player.feed() takes a ctypes pointer plus size=.
+
+	Only NVDA's WasapiWavePlayer is known to; anything else (WinMM, or the
+	32-bit bridge host's player) is fed bytes.
+	"""
+	wasapi = getattr(nvwave, "WasapiWavePlayer", None)
+	if wasapi is None or not isinstance(player, wasapi):
+		return False
+	try:
+		return "size" in inspect.signature(player.feed).parameters
+	except (TypeError, ValueError):
+		return False
+
 
 # ---------------------------------------------------------------------------
-# AudioWorker (pulls audio from queue and feeds to nvwave.WavePlayer)
+# AudioRing (single-producer/single-consumer hand-off to AudioWorker)
+# ---------------------------------------------------------------------------
+
+class AudioRing:
+	"""Bounded SPSC ring between the speaking thread and AudioWorker.
+
+	Only the speaking thread calls put() and only AudioWorker calls peek()
+	and advance(), so each index has exactly one writer and no lock is
+	needed; the events are only touched when the other side may be asleep.
+	The consumer retires a slot only after handling it, so empty() also
+	means AudioWorker is no longer touching the player.
+	"""
+
+	def __init__(self, capacity: int = 1024):
+		if capacity & (capacity - 1):
+			raise ValueError("capacity must be a power of two")
+		self._mask = capacity - 1
+		self._slots: List[Optional[AudioChunk]] = [None] * capacity
+		self._head = 0  # next slot to write (producer only)
+		self._tail = 0  # next slot to read (consumer only)
+		self._not_empty = threading.Event()
+		self._not_full = threading.Event()
+
+	def put(self, item: AudioChunk) -> None:
+		head = self._head
+		while head - self._tail > self._mask:
+			self._not_full.clear()
+			if head - self._tail > self._mask:
+				self._not_full.wait(0.1)
+		self._slots[head & self._mask] = item
+		self._head = head + 1
+		# Publish the slot before checking the event so a consumer that
+		# clears it afterwards still sees the item.
+		if not self._not_empty.is_set():
+			self._not_empty.set()
+
+	def empty(self) -> bool:
+		return self._head == self._tail
+
+	def peek(self) -> Optional[AudioChunk]:
+		"""Return the oldest item without retiring it, or None if empty."""
+		tail = self._tail
+		if tail == self._head:
+			return None
+		return self._slots[tail & self._mask]
+
+	def advance(self) -> None:
+		"""Retire the item returned by the last peek()."""
+		tail = self._tail
+		self._slots[tail & self._mask] = None
+		self._tail = tail + 1
+		if not self._not_full.is_set():
+			self._not_full.set()
+
+	def wait(self, timeout: float) -> None:
+		"""Block the consumer until put() or wake() is called, or timeout."""
+		self._not_empty.wait(timeout)
+		self._not_empty.clear()
+
+	def wake(self) -> None:
+		self._not_empty.set()
+
+	def clear(self) -> None:
+		"""Drop everything queued. Only safe once the consumer has exited."""
+		self._slots[:] = [None] * (self._mask + 1)
+		self._head = self._tail = 0
+		self._not_empty.clear()
+		self._not_full.set()
+
+
+# ---------------------------------------------------------------------------
+# AudioWorker (runs queued player events off the speaking thread)
 # ---------------------------------------------------------------------------
 
 class AudioWorker(threading.Thread):
-	"""Pulls audio events from the queue and feeds them to nvwave.WavePlayer."""
+	"""Runs player events that must not block the speaking thread.
 
-	def __init__(self, player, audio_queue: "queue.Queue[Optional[AudioChunk]]",
-				 get_sequence: Callable[[], int],
+	The read loop feeds audio straight to nvwave.WavePlayer; only idle()
+	(which waits for playback) and anything queued behind it come here.
+	"""
+
+	def __init__(self, player, ring: AudioRing,
+				 sequence_var: ctypes.c_uint32,
 				 player_lock: Optional[threading.RLock] = None,
 				 auto_idle: bool = True):
 		super().__init__(daemon=True, name="EloquenceAudioWorker")
 		self._player = player
-		self._queue = audio_queue
-		self._get_sequence = get_sequence
+		self._ring = ring
+		# Shared with EloquenceClient; stop() bumps it to drop stale chunks.
+		self._seq_var = sequence_var
 		self._running = True
 		self._stopping = False
 		self._player_lock = player_lock or threading.RLock()
 		self._auto_idle = auto_idle
 
 	def run(self) -> None:
+		ring = self._ring
 		while self._running:
-			try:
-				chunk = self._queue.get(timeout=0.1)
-			except queue.Empty:
-				continue
+			chunk = ring.peek()
 			if chunk is None:
-				break
-
-			data, second, is_final, seq = chunk
-
-			if seq < self._get_sequence():
-				self._queue.task_done()
+				ring.wait(0.1)
 				continue
+			try:
+				self._handle(chunk)
+			finally:
+				ring.advance()
 
-			# Marker callback: feed empty buffer with onDone to WavePlayer
-			if callable(second):
-				if not self._stopping:
-					try:
-						with self._player_lock:
-							if not self._stopping and self._player:
-								self._player.feed(b"", onDone=second)
-					except Exception:
-						LOGGER.exception("Marker feed failed")
-				self._queue.task_done()
-				continue
+	def _handle(self, chunk: AudioChunk) -> None:
+		data, second, is_final, seq = chunk
 
-			# Idle signal
-			if second == "IDLE":
-				if not self._stopping:
-					try:
-						with self._player_lock:
-							if not self._stopping and self._player:
-								self._player.idle()
-					except Exception:
-						LOGGER.exception("Player idle failed")
-				self._queue.task_done()
-				continue
+		if seq < self._seq_var.value:
+			return
+
+		# Marker callback: feed empty buffer with onDone to WavePlayer
+		if callable(second):
+			if not self._stopping:
+				try:
+					with self._player_lock:
+						if not self._stopping and self._player:
+							self._player.feed(b"", onDone=second)
+				except Exception:
+					LOGGER.exception("Marker feed failed")
+			return
 
-			# Done marker (from _read_loop)
-			if not data and second is None:
-				if is_final and self._auto_idle:
+		# Idle signal
+		if second == "IDLE":
+			if not self._stopping:
+				try:
 					with self._player_lock:
-						if not self._stopping:
+						if not self._stopping and self._player:
 							self._player.idle()
+				except Exception:
+					LOGGER.exception("Player idle failed")
+			return
+
+		# Done marker (from _read_loop)
+		if not data and second is None:
+			if is_final and self._auto_idle:
+				with self._player_lock:
 					if not self._stopping:
-						self._invoke_done_callback()
-				self._queue.task_done()
-				continue
+						self._player.idle()
+				if not self._stopping:
+					self._invoke_done_callback()
+			return
 
-			if self._stopping:
-				self._queue.task_done()
-				continue
+		if self._stopping:
+			return
 
-			try:
-				with self._player_lock:
-					if not self._stopping and self._player:
-						self._player.feed(data)
-			except FileNotFoundError:
-				LOGGER.warning("Sound device not found during feed")
-			except Exception:
-				LOGGER.exception("WavePlayer feed failed")
-			self._queue.task_done()
+		try:
+			with self._player_lock:
+				if not self._stopping and self._player:
+					self._player.feed(data)
+		except FileNotFoundError:
+			LOGGER.warning("Sound device not found during feed")
+		except Exception:
+			LOGGER.exception("WavePlayer feed failed")
 
 	def stop(self) -> None:
 		self._stopping = True
 		self._running = False
-		self._queue.put(None)
+		self._ring.wake()
 
 	def _invoke_done_callback(self) -> None:
 		if _on_done:
@@ -148,12 +254,16 @@ class EloquenceClient:
 
 	def __init__(self) -> None:
 		self._dll = None
-		self._audio_queue: "queue.Queue[Optional[AudioChunk]]" = queue.Queue()
+		# Allowlisted exports, resolved once in _setup_ctypes. Empty before
+		# that and after shutdown, when dll_call returns None.
+		self._dll_funcs: Dict[str, Any] = {}
+		self._audio_ring = AudioRing()
 		self._player = None
 		self._player_lock = threading.RLock()
 		self._audio_worker: Optional[AudioWorker] = None
+		self._auto_idle = False
 		self._should_stop = False
-		self._sequence = 0
+		self._sequence_var = ctypes.c_uint32(0)
 		self._current_seq = 0
 		# Audio format
 		self._sample_rate = 0
@@ -161,11 +271,19 @@ class EloquenceClient:
 		self._bits_per_sample = 0
 		# Engine tracking
 		self._engine_dir: Optional[str] = None
-		# Read buffer
-		self._buf_size = 65536
+		# Read buffer. eloq_read drains every queued audio slice that fits,
+		# so a larger buffer means fewer calls (and GIL round-trips) per
+		# utterance.
+		self._buf_size = 262144
 		self._audio_buf = None
+		self._audio_addr = 0
 		self._out_type = None
 		self._out_value = None
+		self._out_type_addr = 0
+		self._out_value_addr = 0
+		# WasapiWavePlayer.feed() takes a pointer plus size and copies into
+		# its own buffer before returning; set by _feeds_pointer().
+		self._feed_pointer = False
 
 	def do_initialize(self, dll_path: str, engine_dir: str) -> Dict[str, Any]:
 		"""Load the wrapper DLL and initialize the ECI engine."""
@@ -182,6 +300,8 @@ class EloquenceClient:
 
 		if self._dll is None:
 			LOGGER.info("_oldeloq: loading wrapper DLL from %s", dll_path)
+			# cdll (not PyDLL): ctypes releases the GIL for the duration of
+			# each call, so a blocked eloq_read_wait doesn't stall NVDA.
 			self._dll = ctypes.cdll.LoadLibrary(dll_path)
 			self._setup_ctypes()
 
@@ -191,8 +311,14 @@ class EloquenceClient:
 			self._engine_dir = None
 
 		self._audio_buf = ctypes.create_string_buffer(self._buf_size)
+		self._audio_addr = ctypes.addressof(self._audio_buf)
 		self._out_type = ctypes.c_int(0)
 		self._out_value = ctypes.c_int(0)
+		# The read loop passes plain integer addresses: eloq_read's
+		# arguments are declared c_void_p, which accepts an int as-is, so
+		# there is no per-call byref()/pointer marshaling.
+		self._out_type_addr = ctypes.addressof(self._out_type)
+		self._out_value_addr = ctypes.addressof(self._out_value)
 
 		LOGGER.info("_oldeloq: calling eloq_init(%s)", engine_dir)
 		rc = self._dll.eloq_init(engine_dir)
@@ -241,15 +367,32 @@ class EloquenceClient:
 		dll.eloq_format.restype = ctypes.c_int
 		dll.eloq_speak.argtypes = (ctypes.c_char_p,)
 		dll.eloq_speak.restype = ctypes.c_int
+		dll.eloq_speak_batch.argtypes = (
+			ctypes.POINTER(ctypes.c_char_p),
+			ctypes.POINTER(ctypes.c_int),
+			ctypes.POINTER(ctypes.c_int),
+			ctypes.c_int,
+		)
+		dll.eloq_speak_batch.restype = ctypes.c_int
 		dll.eloq_stop.argtypes = ()
 		dll.eloq_stop.restype = ctypes.c_int
+		# Out-params are int* in C; declared c_void_p so the cached
+		# addresses from do_initialize can be passed without conversion.
 		dll.eloq_read.argtypes = (
 			ctypes.c_void_p,
 			ctypes.c_int,
-			ctypes.POINTER(ctypes.c_int),
-			ctypes.POINTER(ctypes.c_int),
+			ctypes.c_void_p,
+			ctypes.c_void_p,
 		)
 		dll.eloq_read.restype = ctypes.c_int
+		dll.eloq_read_wait.argtypes = (
+			ctypes.c_void_p,
+			ctypes.c_int,
+			ctypes.c_void_p,
+			ctypes.c_void_p,
+			ctypes.c_int,
+		)
+		dll.eloq_read_wait.restype = ctypes.c_int
 		dll.eloq_set_variant.argtypes = (ctypes.c_int,)
 		dll.eloq_set_variant.restype = ctypes.c_int
 		dll.eloq_set_vparam.argtypes = (ctypes.c_int, ctypes.c_int)
@@ -264,6 +407,14 @@ class EloquenceClient:
 		dll.eloq_set_rate_boost.restype = ctypes.c_int
 		dll.eloq_get_rate_boost.argtypes = ()
 		dll.eloq_get_rate_boost.restype = ctypes.c_int
+		dll.eloq_apply_state.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int)
+		dll.eloq_apply_state.restype = ctypes.c_int
+
+		self._dll_funcs = {
+			# Every allowlisted export was configured above, so a wrapper
+			# build missing one has already failed with AttributeError.
+			name: getattr(dll, name) for name in _ALLOWED_DLL_CALLS
+		}
 
 	# ------------------------------------------------------------------
 	# Audio
@@ -286,10 +437,11 @@ class EloquenceClient:
 			player = nvwave.WavePlayer(channels, sample_rate, bits_per_sample,
 									   outputDevice=device, buffered=True)
 		self._player = player
-		self._audio_worker = AudioWorker(player, self._audio_queue,
-										 lambda: self._sequence,
+		self._feed_pointer = _feeds_pointer(nvwave, player)
+		self._audio_worker = AudioWorker(player, self._audio_ring,
+										 self._sequence_var,
 										 player_lock=self._player_lock,
-										 auto_idle=False)
+										 auto_idle=self._auto_idle)
 		self._audio_worker.start()
 
 	# ------------------------------------------------------------------
@@ -297,73 +449,175 @@ class EloquenceClient:
 	def do_speak(self, text_bytes: bytes) -> bool:
 		"""Start speech and pump read loop. Returns True on success."""
 		self._should_stop = False
-		self._current_seq = self._sequence
+		self._current_seq = self._sequence_var.value
 		rc = self._dll.eloq_speak(text_bytes)
 		if rc != 0:
 			LOGGER.error("eloq_speak returned %d for %r", rc, text_bytes[:80])
-			self._audio_queue.put((b"", None, True, self._current_seq))
+			self._signal_done(self._current_seq)
 			return False
 		LOGGER.debug("eloq_speak OK, seq=%d, entering read loop", self._current_seq)
 		return self._read_loop()
 
-	def _read_loop(self) -> bool:
-		"""Poll eloq_read() and push audio to queue. Returns True if completed normally."""
+	def do_speak_batch(self, texts: List[bytes], pitches: List[int],
+					   on_reached: List[Optional[Callable[[], None]]]) -> bool:
+		"""Speak segments in one wrapper call and pump the read loop.
+
+		pitches[i] >= 0 overrides the pitch for segment i. on_reached[i], if
+		set, is called on this thread once all of segment i's audio has been
+		handed to the player. Returns True on success.
+		"""
+		n = len(texts)
+		markers = [i if cb is not None else -1 for i, cb in enumerate(on_reached)]
+		self._should_stop = False
+		self._current_seq = self._sequence_var.value
+		rc = self._dll.eloq_speak_batch(
+			(ctypes.c_char_p * n)(*texts),
+			(ctypes.c_int * n)(*pitches),
+			(ctypes.c_int * n)(*markers),
+			n,
+		)
+		if rc != 0:
+			LOGGER.error("eloq_speak_batch returned %d for %d segments", rc, n)
+			self._signal_done(self._current_seq)
+			return False
+		return self._read_loop(on_reached)
+
+	def _read_loop(self, on_reached: Optional[List[Optional[Callable[[], None]]]] = None) -> bool:
+		"""Pump eloq_read_wait() and feed audio to the player. Returns True if completed normally.
+
+		INDEX items carry a segment number from eloq_speak_batch; the
+		matching on_reached callback runs after the audio before it is fed.
+		"""
+		# Bind everything the loop touches to locals; this runs once per
+		# poll and competes with the audio worker for the GIL.
+		eloq_read_wait = self._dll.eloq_read_wait
+		buf_size = self._buf_size
+		addr = self._audio_addr
+		type_addr = self._out_type_addr
+		value_addr = self._out_value_addr
+		out_type = self._out_type
+		ring = self._audio_ring
+		put = ring.put
+		ring_empty = ring.empty
+		feed = self._feed_direct
+		feed_pointer = self._feed_pointer
+		string_at = ctypes.string_at
+		c_void_p = ctypes.c_void_p
+		seq = self._current_seq
 		audio_chunks = 0
 		audio_bytes = 0
+		# Bytes of audio gathered at the front of the read buffer, not yet fed.
+		filled = 0
+
+		def flush() -> None:
+			# feed() blocks once the player's buffer is full, so this loop
+			# can stall until playback catches up. The backlog stays in the
+			# wrapper's output queue, which keeps the whole current utterance
+			# and drops nothing.
+			if ring_empty():
+				if feed_pointer:
+					# WASAPI copies straight out of the read buffer, and
+					# is done with it before the next eloq_read_wait.
+					feed(c_void_p(addr), size=filled)
+				else:
+					# string_at copies exactly `filled` bytes; .raw would
+					# materialize the whole read buffer first.
+					feed(string_at(addr, filled))
+			else:
+				# AudioWorker still has an idle/marker pending from the
+				# previous utterance; queue behind it to keep order.
+				put((string_at(addr, filled), None, False, seq))
+
 		while not self._should_stop:
 			try:
-				n = self._dll.eloq_read(
-					self._audio_buf,
-					self._buf_size,
-					ctypes.byref(self._out_type),
-					ctypes.byref(self._out_value),
+				# Blocks in the wrapper until an item arrives, stop() is
+				# called, or the timeout elapses (ELOQ_ITEM_NONE). While
+				# audio is pending, only poll so it isn't held back.
+				n = eloq_read_wait(
+					addr + filled, buf_size - filled, type_addr, value_addr,
+					0 if filled else _READ_WAIT_MS,
 				)
 			except Exception:
 				LOGGER.exception("eloq_read crashed")
-				self._audio_queue.put((b"", None, True, self._current_seq))
+				self._signal_done(seq)
 				return False
 
-			t = self._out_type.value
+			t = out_type.value
 
 			if t == ELOQ_ITEM_AUDIO and n > 0:
 				audio_chunks += 1
 				audio_bytes += n
-				self._audio_queue.put((bytes(self._audio_buf.raw[:n]), None, False, self._current_seq))
-			elif t == ELOQ_ITEM_INDEX:
-				# Index from engine — ignored (we use feed_marker instead)
-				pass
+				filled += n
+				if filled < _COALESCE_BYTES:
+					continue
+			if filled:
+				flush()
+				filled = 0
+
+			if t == ELOQ_ITEM_INDEX:
+				if on_reached is not None:
+					i = self._out_value.value
+					if 0 <= i < len(on_reached) and on_reached[i] is not None:
+						try:
+							on_reached[i]()
+						except Exception:
+							LOGGER.exception("Segment callback failed")
 			elif t == ELOQ_ITEM_DONE:
 				LOGGER.debug("read_loop DONE: %d chunks, %d bytes", audio_chunks, audio_bytes)
-				self._audio_queue.put((b"", None, True, self._current_seq))
+				self._signal_done(seq)
 				return True
 			elif t == ELOQ_ITEM_ERROR:
 				LOGGER.error("Wrapper error %d", self._out_value.value)
-				self._audio_queue.put((b"", None, True, self._current_seq))
+				self._signal_done(seq)
 				return False
-			elif t == ELOQ_ITEM_NONE:
-				time.sleep(0.001)
 		LOGGER.debug("read_loop stopped: %d chunks, %d bytes", audio_chunks, audio_bytes)
 		return False
 
+	def _signal_done(self, seq: int) -> None:
+		# Only AudioWorker's auto-idle mode consumes the done marker; skip
+		# it otherwise so the ring stays empty and audio keeps the direct path.
+		if self._auto_idle:
+			self._audio_ring.put((b"", None, True, seq))
+
+	def _feed_direct(self, data, on_done=None, size: Optional[int] = None) -> None:
+		"""Feed the player on the calling thread; only valid while the ring is empty.
+
+		``size`` is only passed for a ctypes pointer (WasapiWavePlayer).
+		"""
+		try:
+			with self._player_lock:
+				if not self._should_stop and self._player:
+					if size is not None:
+						self._player.feed(data, size=size)
+					elif on_done is None:
+						self._player.feed(data)
+					else:
+						self._player.feed(data, onDone=on_done)
+		except FileNotFoundError:
+			LOGGER.warning("Sound device not found during feed")
+		except Exception:
+			LOGGER.exception("WavePlayer feed failed")
+
 	# ------------------------------------------------------------------
 	# Control
 	def dll_call(self, func_name: str, *args):
-		if func_name not in _ALLOWED_DLL_CALLS:
-			raise ValueError(f"Disallowed: {func_name}")
-		fn = getattr(self._dll, func_name, None)
-		if fn:
-			return fn(*args)
+		fn = self._dll_funcs.get(func_name)
+		if fn is None:
+			if func_name not in _ALLOWED_DLL_CALLS:
+				raise ValueError(f"Disallowed: {func_name}")
+			return None
+		return fn(*args)
 
 	def stop(self) -> None:
-		self._sequence += 1
+		self._sequence_var.value += 1
 		self._should_stop = True
 		if self._audio_worker:
 			self._audio_worker._stopping = True
 		if self._dll:
 			self._dll.eloq_stop()
 		# Call player.stop() WITHOUT the lock — WavePlayer.stop() is
-		# thread-safe.  Using the lock here would deadlock if AudioWorker
-		# is blocked inside feed() on WASAPI buffer space.
+		# thread-safe.  Using the lock here would deadlock if the read
+		# loop or AudioWorker is blocked inside feed() on WASAPI buffer space.
 		if self._player:
 			try:
 				self._player.stop()
@@ -376,10 +630,15 @@ class EloquenceClient:
 				self._player.pause(switch)
 
 	def feed_marker(self, on_done=None) -> None:
-		self._audio_queue.put((b"", on_done, False, self._current_seq))
+		if self._audio_ring.empty():
+			self._feed_direct(b"", on_done)
+		else:
+			self._audio_ring.put((b"", on_done, False, self._current_seq))
 
 	def player_idle(self) -> None:
-		self._audio_queue.put((b"", "IDLE", False, self._current_seq))
+		# idle() blocks until playback drains, so it always goes through
+		# AudioWorker to keep the speaking thread free for the next utterance.
+		self._audio_ring.put((b"", "IDLE", False, self._current_seq))
 
 	def get_format(self) -> Dict[str, int]:
 		return {
@@ -404,9 +663,12 @@ class EloquenceClient:
 			import ctypes
 			ctypes.windll.kernel32.FreeLibrary(self._dll._handle)
 			self._dll = None
+			self._dll_funcs = {}
 		self._engine_dir = None
-		self._audio_queue = queue.Queue()
-		self._sequence = 0
+		# Reset in place: anything still holding the ring (a late
+		# feed_marker, the next AudioWorker) keeps a live reference.
+		self._audio_ring.clear()
+		self._sequence_var.value = 0
 		self._current_seq = 0
 
 
@@ -415,6 +677,7 @@ class EloquenceClient:
 # ---------------------------------------------------------------------------
 
 _client: EloquenceClient = EloquenceClient()
+_do_speak = _client.do_speak
 _on_done: Optional[Callable] = None
 _format: Dict[str, int] = {}
 
@@ -424,10 +687,7 @@ def initialize(engine_dir: str, done_callback=None) -> Dict[str, Any]:
 	global _on_done, _format
 	_on_done = done_callback
 
-	addon_dir = os.path.abspath(os.path.dirname(__file__))
-	dll_path = os.path.join(addon_dir, "eloquence_wrapper.dll")
-
-	result = _client.do_initialize(dll_path, engine_dir)
+	result = _client.do_initialize(_WRAPPER_DLL, engine_dir)
 
 	_format = result.get("format", {})
 
@@ -451,14 +711,48 @@ def initialize(engine_dir: str, done_callback=None) -> Dict[str, Any]:
 	return result
 
 
-def speak(text: str) -> bool:
-	"""Speak text (blocks until audio is queued). Returns True on success."""
+def _encode(text: str | bytes) -> bytes:
+	# Drivers may hand over text they have already encoded to cp1252.
+	if isinstance(text, bytes):
+		return text
+	if text.isascii():
+		return text.encode("ascii")
+	return _cp1252_encode(text, "replace")[0]
+
+
+def speak(text: str | bytes) -> bool:
+	"""Speak text, str or cp1252 bytes (blocks until audio is queued).
+
+	Returns True on success.
+	"""
 	# Reset AudioWorker's stopping flag so it will feed new audio
 	if _client._audio_worker:
 		_client._audio_worker._stopping = False
-	text_bytes = text.encode("windows-1252", errors="replace")
-	LOGGER.debug("speak: %r", text_bytes[:120])
-	return _client.do_speak(text_bytes)
+	text_bytes = _encode(text)
+	if LOGGER.isEnabledFor(logging.DEBUG):
+		LOGGER.debug("speak: %r", text_bytes[:120])
+	return _do_speak(text_bytes)
+
+
+def speak_batch(segments) -> bool:
+	"""Speak (text, pitch, on_reached) segments as one utterance.
+
+	text is str or already cp1252-encoded bytes. pitch is an absolute voice
+	pitch for that segment, or -1 for the base pitch. on_reached (or None)
+	is called from the speaking thread once the segment's audio has been
+	handed to the player; use feed_marker() inside it to wait for playback.
+	Blocks until audio is queued.
+	"""
+	if _client._audio_worker:
+		_client._audio_worker._stopping = False
+	texts = []
+	pitches = []
+	callbacks = []
+	for text, pitch, on_reached in segments:
+		texts.append(_encode(text))
+		pitches.append(pitch)
+		callbacks.append(on_reached)
+	return _client.do_speak_batch(texts, pitches, callbacks)
 
 
 def dll_call(func_name: str, *args):
@@ -494,7 +788,7 @@ def get_format() -> Dict[str, int]:
 
 def check(engine_dir: str) -> bool:
 	"""Check if wrapper DLL and engine DLL are present."""
-	addon_dir = os.path.abspath(os.path.dirname(__file__))
-	wrapper_dll = os.path.join(addon_dir, "eloquence_wrapper.dll")
-	eci_dll = os.path.join(engine_dir, "eci32d.dll")
-	return os.path.isfile(wrapper_dll) and os.path.isfile(eci_dll)
+	return (
+		os.path.isfile(_WRAPPER_DLL)
+		and os.path.isfile(os.path.join(engine_dir, _ENGINE_DLL_NAME))
+	)
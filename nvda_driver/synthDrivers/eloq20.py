@@ -5,10 +5,12 @@
 # Eloquence 2.0's ENGSYN32.DLL plays directly to speakers.
 
 import os
-import queue
+import re
 import threading
-from collections import OrderedDict
+from collections import deque
 
+import config
+import extensionPoints
 import synthDriverHandler
 from synthDriverHandler import SynthDriver, VoiceInfo
 from speech.commands import IndexCommand, PitchCommand
@@ -19,13 +21,33 @@ from . import _oldeloq20 as _oldeloq
 # Constants
 # ---------------------------------------------------------------------------
 
+_ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+_ENGINE_DIR = os.path.join(_ADDON_DIR, "eloquence")
+
+# Set once config.pre_configSave has been checked for this NVDA process.
+_configChecked = False
+
 variants = {
 	1: "Eddy", 2: "Flo", 3: "Bobbie", 4: "Rocko",
 	5: "Glen", 6: "Sandy", 7: "Grandma", 8: "Grandpa",
 }
 
-minRate = 0
-maxRate = 100
+
+# Characters replaced by a space before speaking: anything non-ASCII, plus
+# the backtick, which starts an ECI inline command.
+_UNSAFE_RE = re.compile(r"[^\x00-\x7f]|`")
+
+
+def _offset_pitch(basePitch, offset):
+	"""Absolute pitch for a PitchCommand offset; -1 keeps the base pitch."""
+	if not offset:
+		return -1
+	return max(0, min(100, int(basePitch + basePitch * offset / 100)))
+
+
+# NVDA's capital pitch change setting is limited to -99..100; offsets outside
+# this range (other PitchCommand users) fall back to _offset_pitch().
+_PITCH_OFFSETS = range(-100, 101)
 
 
 # ---------------------------------------------------------------------------
@@ -33,31 +55,48 @@ maxRate = 100
 # ---------------------------------------------------------------------------
 
 class _BgThread(threading.Thread):
-	def __init__(self, q, stop_event):
+	"""Runs queued work items; the producer appends to items and sets wake.
+
+	busy is set from before an item leaves the deque until the deque has been
+	drained, so "items empty and not busy" means no work is pending or running.
+	"""
+
+	def __init__(self, items, wake, busy):
 		super().__init__(daemon=True, name="Eloq20BgThread")
-		self._q = q
-		self._stop = stop_event
+		self._items = items
+		self._wake = wake
+		self._busy = busy
 
 	def run(self):
-		while not self._stop.is_set():
-			try:
-				item = self._q.get(timeout=0.2)
-			except queue.Empty:
+		items = self._items
+		wake = self._wake
+		busy = self._busy
+		# No timeout: terminate() appends the None sentinel and sets wake,
+		# so there is nothing to poll for while idle.
+		while True:
+			wake.wait()
+			# Clear before draining so an append racing with the drain
+			# leaves the event set for the next pass.
+			wake.clear()
+			if not items:
 				continue
-			try:
+			busy.set()
+			while items:
+				try:
+					item = items.popleft()
+				except IndexError:
+					# cancel() emptied the deque after the check.
+					break
 				if item is None:
 					return
-				func, args, kwargs = item
-				func(*args, **kwargs)
-			except Exception:
-				import logging
-				logging.getLogger(__name__).error(
-					"Eloq20: bg thread error", exc_info=True)
-			finally:
 				try:
-					self._q.task_done()
+					func, args, kwargs = item
+					func(*args, **kwargs)
 				except Exception:
-					pass
+					import logging
+					logging.getLogger(__name__).error(
+						"Eloq20: bg thread error", exc_info=True)
+			busy.clear()
 
 
 # ---------------------------------------------------------------------------
@@ -81,32 +120,39 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 	description = 'Old ETI-Eloquence 2.0'
 	name = 'eloq20'
 
+	# ECI voice param IDs, bound once instead of looked up on _oldeloq per call.
+	_RATE = _oldeloq.RATE
+	_PITCH = _oldeloq.PITCH
+	_VLM = _oldeloq.VLM
+
 	@classmethod
 	def check(cls):
-		engine_dir = os.path.join(os.path.dirname(__file__), "eloquence")
-		return _oldeloq.check(engine_dir)
+		return _oldeloq.check(_ENGINE_DIR)
 
 	def __init__(self):
-		# Ensure config.pre_configSave exists (bridge host compat)
-		import config
-		if not hasattr(config, 'pre_configSave'):
-			import extensionPoints
-			config.pre_configSave = extensionPoints.Action()
+		global _configChecked
+		# Ensure config.pre_configSave exists (bridge host compat); the
+		# config module outlives driver switches, so check it only once.
+		if not _configChecked:
+			if not hasattr(config, 'pre_configSave'):
+				config.pre_configSave = extensionPoints.Action()
+			_configChecked = True
 		super().__init__()
 
-		engine_dir = os.path.join(os.path.dirname(__file__), "eloquence")
-		_oldeloq.initialize(engine_dir)
+		_oldeloq.initialize(_ENGINE_DIR)
 
 		self._voice = "1"
 		self._basePitch = 50
+		self._buildPitchTable()
 
 		self.speaking = False
 		self._speakGeneration = 0
 		self._terminating = False
 
-		self._bgQueue = queue.Queue()
-		self._bgStop = threading.Event()
-		self._bgThread = _BgThread(self._bgQueue, self._bgStop)
+		self._bgItems = deque()
+		self._bgWake = threading.Event()
+		self._bgBusy = threading.Event()
+		self._bgThread = _BgThread(self._bgItems, self._bgWake, self._bgBusy)
 		self._bgThread.start()
 
 		# Apply initial rate
@@ -114,14 +160,15 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 
 	def _enqueue(self, func, *args, **kwargs):
 		if not self._terminating:
-			self._bgQueue.put((func, args, kwargs))
+			self._bgItems.append((func, args, kwargs))
+			self._bgWake.set()
 
 	def terminate(self):
 		self._terminating = True
 		self.cancel()
 		try:
-			self._bgStop.set()
-			self._bgQueue.put(None)
+			self._bgItems.append(None)
+			self._bgWake.set()
 			self._bgThread.join(timeout=2.0)
 		except Exception:
 			pass
@@ -131,14 +178,7 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		self._speakGeneration += 1
 		self.speaking = False
 		_oldeloq.stop()
-		# Restore base pitch after capital pitch changes
-		self.setVParam(_oldeloq.PITCH, self._basePitch)
-		try:
-			while True:
-				self._bgQueue.get_nowait()
-				self._bgQueue.task_done()
-		except queue.Empty:
-			pass
+		self._bgItems.clear()
 
 	def pause(self, switch):
 		_oldeloq.pause(switch)
@@ -146,31 +186,61 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 	# --- Speaking ---
 
 	def speak(self, speechSequence):
-		if len(speechSequence) == 1 and isinstance(speechSequence[0], IndexCommand):
-			self._enqueue(self._notifyIndexesAndDone, [speechSequence[0].index])
+		# Index-only utterances (of any length): notify without building
+		# blocks. Text usually comes first, so other sequences stop at once.
+		indexes = []
+		for item in speechSequence:
+			if not isinstance(item, IndexCommand):
+				break
+			indexes.append(item.index)
+		else:
+			self._notifyOrEnqueue(indexes)
 			return
 
 		blocks, anyText, allIndexes = self._buildBlocks(speechSequence)
 		if not anyText:
-			self._enqueue(self._notifyIndexesAndDone, allIndexes)
+			self._notifyOrEnqueue(allIndexes)
 			return
+		# _speakBg blocks until the engine has synthesized every block, so
+		# it always runs on the bg thread: speak() is called on NVDA's main
+		# thread and must return promptly.
 		self._enqueue(self._speakBg, blocks)
 
+	def _notifyOrEnqueue(self, indexes):
+		# Notifications only queue work onto NVDA's main thread, so when
+		# nothing is pending there's no ordering to preserve and no reason
+		# to wake the bg thread.
+		if not self._bgItems and not self._bgBusy.is_set():
+			self._notifyIndexesAndDone(indexes)
+		else:
+			self._enqueue(self._notifyIndexesAndDone, indexes)
+
 	def _buildBlocks(self, speechSequence):
 		blocks = []
 		textBuf = []
 		pendingIndexes = []
+		allIndexes = []
+		anyText = False
 		curPitchOffset = 0
 
 		def flush():
+			nonlocal pendingIndexes, anyText
 			raw = " ".join(textBuf)
 			textBuf.clear()
 			# Eloquence 2.0 is English-only — strip non-ASCII to avoid
 			# engine crashes on accented/Unicode characters.
-			safe = ''.join(ch if ord(ch) < 128 else ' ' for ch in raw)
-			safe = safe.replace('`', ' ').strip()
-			blocks.append((safe, pendingIndexes.copy(), curPitchOffset))
-			pendingIndexes.clear()
+			# isascii() is a C-level flag check, so the common case never
+			# scans the text in Python or in the regex engine.
+			if not raw.isascii() or "`" in raw:
+				raw = _UNSAFE_RE.sub(" ", raw)
+			safe = raw.strip()
+			if safe:
+				anyText = True
+			# Hand the list to the block and start a new one rather than
+			# copying it.
+			blocks.append((safe, pendingIndexes, curPitchOffset))
+			allIndexes.extend(pendingIndexes)
+			pendingIndexes = []
 
 		for item in speechSequence:
 			if isinstance(item, str):
@@ -188,10 +258,8 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		while blocks and not blocks[-1][0] and not blocks[-1][1]:
 			blocks.pop()
 
-		anyText = any(bool(t) for (t, _, __) in blocks)
-		allIndexes = []
-		for (_, idxs, __) in blocks:
-			allIndexes.extend(idxs)
+		# Trailing blocks dropped above had neither text nor indexes, so
+		# anyText/allIndexes gathered in flush() are still exact.
 		return blocks, anyText, allIndexes
 
 	def _notifyIndexesAndDone(self, indexes):
@@ -204,32 +272,29 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		self._speakGeneration += 1
 		gen = self._speakGeneration
 		self.speaking = True
-		basePitch = self._basePitch
-		lastPitch = None
+		pitchTable = self._pitchTable
 
+		# One wrapper call for the whole utterance; the wrapper applies each
+		# segment's pitch and restores the base pitch afterwards.
+		segments = []
 		for (text, indexesAfter, pitchOffset) in blocks:
-			if not self.speaking:
-				break
 			# Apply pitch offset for capital letter distinction
-			pitch = max(0, min(100, int(basePitch + basePitch * pitchOffset / 100))) if pitchOffset else basePitch
-			if pitch != lastPitch:
-				self.setVParam(_oldeloq.PITCH, pitch)
-				lastPitch = pitch
-			if text:
-				if not _oldeloq.speak(text):
-					self.speaking = False
-					break
-			# Fire indexes right after synthesis so NVDA can prefetch
-			# the next chunk while this one is still playing.
-			if self.speaking and indexesAfter:
-				if self._speakGeneration == gen:
-					for i in indexesAfter:
-						synthDriverHandler.synthIndexReached.notify(
-							synth=self, index=i)
-
-		# Restore base pitch
-		if lastPitch != basePitch:
-			self.setVParam(_oldeloq.PITCH, basePitch)
+			pitch = pitchTable.get(pitchOffset)
+			if pitch is None:
+				pitch = _offset_pitch(self._basePitch, pitchOffset)
+			onReached = None
+			if indexesAfter:
+				# Fire indexes right after synthesis so NVDA can prefetch
+				# the next chunk while this one is still playing.
+				def onReached(idxs=indexesAfter, g=gen):
+					if self._speakGeneration == g:
+						for i in idxs:
+							synthDriverHandler.synthIndexReached.notify(
+								synth=self, index=i)
+			segments.append((text, pitch, onReached))
+
+		if not _oldeloq.speak_batch(segments):
+			self.speaking = False
 
 		if not self.speaking:
 			synthDriverHandler.synthDoneSpeaking.notify(synth=self)
@@ -245,14 +310,6 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 
 	# --- Settings ---
 
-	def _percentToParam(self, val, minVal, maxVal):
-		return int(round(minVal + (maxVal - minVal) * float(val) / 100.0))
-
-	def _paramToPercent(self, val, minVal, maxVal):
-		if maxVal == minVal:
-			return 0
-		return int(round(100.0 * float(val - minVal) / float(maxVal - minVal)))
-
 	def getVParam(self, pr):
 		v = _oldeloq.dll_call("eloq_get_vparam", pr)
 		return v if v is not None and v >= 0 else 0
@@ -261,12 +318,14 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		_oldeloq.dll_call("eloq_set_vparam", int(pr), int(vl))
 
 	# Rate
+	# ECI rate is already 0-100, the same scale as NVDA's percentage, so the
+	# stored setting is the engine value; __init__ sets it before NVDA reads it.
 	def _get_rate(self):
-		return self._paramToPercent(self.getVParam(_oldeloq.RATE), minRate, maxRate)
+		return self._rate
 
 	def _set_rate(self, vl):
-		self._rate = self._percentToParam(vl, minRate, maxRate)
-		self.setVParam(_oldeloq.RATE, self._rate)
+		self._rate = int(round(vl))
+		self.setVParam(self._RATE, self._rate)
 
 	# Pitch
 	def _get_pitch(self):
@@ -274,14 +333,20 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 
 	def _set_pitch(self, vl):
 		self._basePitch = int(vl)
-		self.setVParam(_oldeloq.PITCH, int(vl))
+		self.setVParam(self._PITCH, self._basePitch)
+		self._buildPitchTable()
+
+	def _buildPitchTable(self):
+		# Precomputed per base pitch so _speakBg does a lookup per block.
+		basePitch = self._basePitch
+		self._pitchTable = {off: _offset_pitch(basePitch, off) for off in _PITCH_OFFSETS}
 
 	# Volume
 	def _get_volume(self):
-		return self.getVParam(_oldeloq.VLM)
+		return self.getVParam(self._VLM)
 
 	def _set_volume(self, vl):
-		self.setVParam(_oldeloq.VLM, int(vl))
+		self.setVParam(self._VLM, int(vl))
 
 	# Rate Boost — 2x speed via Sonic time-stretching (no pitch change)
 	def _get_rateBoost(self):
@@ -293,10 +358,10 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 
 	# Voice — 8 ECI variants exposed as NVDA voices
 	def _getAvailableVoices(self):
-		return OrderedDict(
-			(str(k), VoiceInfo(str(k), name, "en"))
+		return {
+			str(k): VoiceInfo(str(k), name, "en")
 			for k, name in variants.items()
-		)
+		}
 
 	def _get_voice(self):
 		return self._voice
@@ -309,10 +374,11 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		if vv not in variants:
 			vv = 1
 		self._voice = str(vv)
-		_oldeloq.dll_call("eloq_set_variant", vv)
-		# Re-apply rate after variant change
-		if hasattr(self, '_rate'):
-			self.setVParam(_oldeloq.RATE, self._rate)
+		# The variant copy resets voice params, so re-apply rate and pitch in
+		# the same call (-1 = leave unchanged). Speech only sends pitch for
+		# shifted segments, so without this the engine would keep the
+		# variant's default pitch.
+		_oldeloq.dll_call("eloq_apply_state", getattr(self, '_rate', -1), self._basePitch, -1, vv)
 
 
 # ---------------------------------------------------------------------------
@@ -325,7 +391,7 @@ if _ctypes.sizeof(_ctypes.c_void_p) == 8:
 	class SynthDriver(_Proxy32):
 		name = "eloq20"
 		description = "Old ETI-Eloquence 2.0"
-		synthDriver32Path = os.path.dirname(__file__)
+		synthDriver32Path = _ADDON_DIR
 		synthDriver32Name = "eloq20"
 
 		_BRIDGE_SAFE = frozenset({"voice", "variant", "rate", "pitch", "volume", "rateBoost"})
@@ -337,8 +403,7 @@ if _ctypes.sizeof(_ctypes.c_void_p) == 8:
 		def check(cls):
 			if not super().check():
 				return False
-			base = os.path.dirname(__file__)
 			return (
-				os.path.isfile(os.path.join(base, "eloquence_wrapper.dll"))
-				and os.path.isfile(os.path.join(base, "eloquence", "eci32d.dll"))
+				os.path.isfile(os.path.join(_ADDON_DIR, "eloquence_wrapper.dll"))
+				and os.path.isfile(os.path.join(_ENGINE_DIR, "eci32d.dll"))
 			)
@@ -4,12 +4,15 @@
 # Wrapper serializes audio + indexes into a pull stream, eliminating
 # the race condition that caused speech to freeze on rapid commands.
 
+import codecs
+import functools
 import re
 import os
-import queue
 import threading
-from collections import OrderedDict
+from collections import OrderedDict, deque
 
+import config
+import extensionPoints
 import synthDriverHandler
 from synthDriverHandler import SynthDriver, VoiceInfo
 from autoSettingsUtils.driverSetting import NumericDriverSetting, BooleanDriverSetting, DriverSetting
@@ -22,6 +25,12 @@ from . import _oldeloq33 as _oldeloq
 # Constants
 # ---------------------------------------------------------------------------
 
+_ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+_ENGINE_DIR = os.path.join(_ADDON_DIR, "eloquence")
+
+# Set once config.pre_configSave has been checked for this NVDA process.
+_configChecked = False
+
 # ECI language IDs (param 9) — maps 3-letter code to (id, display_name)
 langs = {
 	'enu': (65536,  'American English'),
@@ -46,8 +55,19 @@ variants = {
 	5: "Glen", 6: "Sandy", 7: "Grandma", 8: "Grandpa",
 }
 
-minRate = 0
-maxRate = 100
+# Neither list changes at runtime, so build them once at import. NVDA keeps
+# availableVariants per driver instance itself; availablePausemodes is a
+# plain property the settings panel reads on every refresh.
+_VARIANTS = OrderedDict(
+	(str(k), VoiceInfo(str(k), name))
+	for k, name in variants.items()
+)
+
+_PAUSE_MODES = {
+	"0": StringParameterInfo("0", "Do not shorten"),
+	"1": StringParameterInfo("1", "Shorten final punctuation"),
+	"2": StringParameterInfo("2", "Shorten all punctuation"),
+}
 
 # ---------------------------------------------------------------------------
 # Text preprocessing
@@ -59,8 +79,14 @@ anticrash_res = {
 	re.compile(r'hesday'): ' hesday',
 	re.compile(r"\b(|\d+|\W+)tz[s]che", re.I): r'\1tz sche',
 }
-pause_re = re.compile(r'([a-zA-Z])([.(),:;!?])( |$)')
+# Zero-width: matches between a letter and punctuation that ends a word, so
+# the substitution is a plain string insert with no group expansion.
+pause_re = re.compile(r'(?<=[a-zA-Z])(?=[.(),:;!?](?: |$))')
 time_re = re.compile(r"(\d):(\d+):(\d+)")
+final_punct_re = re.compile(r'([.(),:;!?])$')
+
+_cp1252_encode = codecs.getencoder('windows-1252')
+_cp1252_decode = codecs.getdecoder('windows-1252')
 
 
 def _resub(dct, s):
@@ -69,36 +95,113 @@ def _resub(dct, s):
 	return s
 
 
+def _anticrash(text):
+	# Every anticrash_res entry needs one of these literals, so most text
+	# never reaches the regexes. Input is already cp1252, where lower()
+	# agrees with re.I. When one is present all entries run in order, as
+	# later entries must see earlier replacements.
+	lowered = text.lower()
+	if "sur" in lowered or "h'" in lowered or "tzsche" in lowered or "hesday" in text:
+		return _resub(anticrash_res, text)
+	return text
+
+
+def _process_text(text, volume, abrdict, pauseMode):
+	"""Preprocess non-empty text for ECI; a pure function of its arguments."""
+	isAscii = text.isascii()
+	if not isAscii:
+		# Replace anything the engine's code page can't represent.
+		text = _cp1252_decode(_cp1252_encode(text, 'replace')[0], 'replace')[0]
+	# Sanitize backticks in user text first; they are non-word
+	# characters just like the space replacing them, so the anticrash
+	# patterns match the same way either side of this.
+	text = _anticrash(text.replace('`', ' '))
+
+	# Fix times
+	text = time_re.sub(r'\1:\2 \3', text)
+
+	# Shorten pauses
+	if pauseMode == 2:
+		text = pause_re.sub(' `p1', text)
+	elif pauseMode == 1:
+		shortened, n = final_punct_re.subn(r' `p1\1', text.rstrip())
+		if n:
+			text = shortened
+
+	# Abbreviation dictionary + inline volume in front, end-of-utterance
+	# pause behind; user text can't contain a backtick, so it never
+	# already ends with `p2.
+	text = "`da%d  `vv%d %s `p2" % (1 if abrdict else 0, volume, text)
+	# Hand the engine bytes directly. Everything above only adds ASCII,
+	# and non-ASCII input was already reduced to cp1252, so neither
+	# encode can fail.
+	return text.encode("ascii") if isAscii else _cp1252_encode(text)[0]
+
+
+# Only short text goes through the cache; see SynthDriver._processText.
+_CACHED_TEXT_LEN = 256
+_process_text_cached = functools.lru_cache(maxsize=1024)(_process_text)
+
+
+def _offset_pitch(basePitch, offset):
+	"""Absolute pitch for a PitchCommand offset; -1 keeps the base pitch."""
+	if not offset:
+		return -1
+	return max(0, min(100, int(basePitch + basePitch * offset / 100)))
+
+
+# NVDA's capital pitch change setting is limited to -99..100; offsets outside
+# this range (other PitchCommand users) fall back to _offset_pitch().
+_PITCH_OFFSETS = range(-100, 101)
+
+
 # ---------------------------------------------------------------------------
 # Background thread
 # ---------------------------------------------------------------------------
 
 class _BgThread(threading.Thread):
-	def __init__(self, q, stop_event):
+	"""Runs queued work items; the producer appends to items and sets wake.
+
+	busy is set from before an item leaves the deque until the deque has been
+	drained, so "items empty and not busy" means no work is pending or running.
+	"""
+
+	def __init__(self, items, wake, busy):
 		super().__init__(daemon=True, name="OldEloquenceBgThread")
-		self._q = q
-		self._stop = stop_event
+		self._items = items
+		self._wake = wake
+		self._busy = busy
 
 	def run(self):
-		while not self._stop.is_set():
-			try:
-				item = self._q.get(timeout=0.2)
-			except queue.Empty:
+		items = self._items
+		wake = self._wake
+		busy = self._busy
+		# No timeout: terminate() appends the None sentinel and sets wake,
+		# so there is nothing to poll for while idle.
+		while True:
+			wake.wait()
+			# Clear before draining so an append racing with the drain
+			# leaves the event set for the next pass.
+			wake.clear()
+			if not items:
 				continue
-			try:
+			busy.set()
+			while items:
+				try:
+					item = items.popleft()
+				except IndexError:
+					# cancel() emptied the deque after the check.
+					break
 				if item is None:
 					return
-				func, args, kwargs = item
-				func(*args, **kwargs)
-			except Exception:
-				import logging
-				logging.getLogger(__name__).error(
-					"OldEloquence: bg thread error", exc_info=True)
-			finally:
 				try:
-					self._q.task_done()
+					func, args, kwargs = item
+					func(*args, **kwargs)
 				except Exception:
-					pass
+					import logging
+					logging.getLogger(__name__).error(
+						"OldEloquence: bg thread error", exc_info=True)
+			busy.clear()
 
 
 # ---------------------------------------------------------------------------
@@ -129,35 +232,49 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 	description = 'Old ETI-Eloquence'
 	name = 'oldeloquence'
 
+	# ECI voice param IDs, bound once instead of looked up on _oldeloq per call.
+	_RATE = _oldeloq.RATE
+	_PITCH = _oldeloq.PITCH
+	_VLM = _oldeloq.VLM
+	_FLUCTUATION = _oldeloq.FLUCTUATION
+	_HSZ = _oldeloq.HSZ
+	_RGH = _oldeloq.RGH
+	_BTH = _oldeloq.BTH
+
 	@classmethod
 	def check(cls):
-		engine_dir = os.path.join(os.path.dirname(__file__), "eloquence")
-		return _oldeloq.check(engine_dir)
+		return _oldeloq.check(_ENGINE_DIR)
 
 	def __init__(self):
-		# Ensure config.pre_configSave exists (bridge host compat)
-		import config
-		if not hasattr(config, 'pre_configSave'):
-			import extensionPoints
-			config.pre_configSave = extensionPoints.Action()
+		global _configChecked
+		# Ensure config.pre_configSave exists (bridge host compat); the
+		# config module outlives driver switches, so check it only once.
+		if not _configChecked:
+			if not hasattr(config, 'pre_configSave'):
+				config.pre_configSave = extensionPoints.Action()
+			_configChecked = True
 		super().__init__()
 
-		engine_dir = os.path.join(os.path.dirname(__file__), "eloquence")
-		_oldeloq.initialize(engine_dir)
+		_oldeloq.initialize(_ENGINE_DIR)
+		# Mirrors the wrapper's shadow value, which only changes through
+		# _set_volume; read on every utterance for the inline `vv.
+		self._volume = self.getVParam(self._VLM)
 
 		self.curvoice = "enu"
 		self._variant = "1"
 		self._ABRDICT = False
 		self._pause_mode = 2
 		self._basePitch = 50
+		self._buildPitchTable()
 
 		self.speaking = False
 		self._speakGeneration = 0
 		self._terminating = False
 
-		self._bgQueue = queue.Queue()
-		self._bgStop = threading.Event()
-		self._bgThread = _BgThread(self._bgQueue, self._bgStop)
+		self._bgItems = deque()
+		self._bgWake = threading.Event()
+		self._bgBusy = threading.Event()
+		self._bgThread = _BgThread(self._bgItems, self._bgWake, self._bgBusy)
 		self._bgThread.start()
 
 		# Apply initial rate
@@ -165,14 +282,15 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 
 	def _enqueue(self, func, *args, **kwargs):
 		if not self._terminating:
-			self._bgQueue.put((func, args, kwargs))
+			self._bgItems.append((func, args, kwargs))
+			self._bgWake.set()
 
 	def terminate(self):
 		self._terminating = True
 		self.cancel()
 		try:
-			self._bgStop.set()
-			self._bgQueue.put(None)
+			self._bgItems.append(None)
+			self._bgWake.set()
 			self._bgThread.join(timeout=2.0)
 		except Exception:
 			pass
@@ -182,14 +300,11 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		self._speakGeneration += 1
 		self.speaking = False
 		_oldeloq.stop()
-		# Restore base pitch after capital pitch changes
-		self.setVParam(_oldeloq.PITCH, self._basePitch)
-		try:
-			while True:
-				self._bgQueue.get_nowait()
-				self._bgQueue.task_done()
-		except queue.Empty:
-			pass
+		# Drop queued work in one step. An in-flight _speakBg is inside a
+		# single eloq_speak_batch call: stop() above interrupts it, so
+		# speak_batch returns False and _speakBg finishes without waiting
+		# for playback.
+		self._bgItems.clear()
 
 	def pause(self, switch):
 		_oldeloq.pause(switch)
@@ -197,29 +312,56 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 	# --- Speaking ---
 
 	def speak(self, speechSequence):
-		# Index-only utterances: notify immediately
-		if len(speechSequence) == 1 and isinstance(speechSequence[0], IndexCommand):
-			self._enqueue(self._notifyIndexesAndDone, [speechSequence[0].index])
+		# Index-only utterances (of any length): notify without building
+		# blocks. Text usually comes first, so other sequences stop at once.
+		indexes = []
+		for item in speechSequence:
+			if not isinstance(item, IndexCommand):
+				break
+			indexes.append(item.index)
+		else:
+			self._notifyOrEnqueue(indexes)
 			return
 
 		blocks, anyText, allIndexes = self._buildBlocks(speechSequence)
 		if not anyText:
-			self._enqueue(self._notifyIndexesAndDone, allIndexes)
+			self._notifyOrEnqueue(allIndexes)
 			return
 		self._enqueue(self._speakBg, blocks)
 
+	def _notifyOrEnqueue(self, indexes):
+		# Notifications only queue work onto NVDA's main thread, so when
+		# nothing is pending there's no ordering to preserve and no reason
+		# to wake the bg thread.
+		if not self._bgItems and not self._bgBusy.is_set():
+			self._notifyIndexesAndDone(indexes)
+		else:
+			self._enqueue(self._notifyIndexesAndDone, indexes)
+
 	def _buildBlocks(self, speechSequence):
 		blocks = []
 		textBuf = []
 		pendingIndexes = []
+		allIndexes = []
+		anyText = False
 		curPitchOffset = 0
 
 		def flush():
+			nonlocal pendingIndexes, anyText
 			raw = " ".join(textBuf)
 			textBuf.clear()
-			safe = self._processText(raw)
-			blocks.append((safe, pendingIndexes.copy(), curPitchOffset))
-			pendingIndexes.clear()
+			# Whitespace-only text would still come back wrapped in command
+			# codes; it speaks nothing, so keep the block only for its indexes.
+			if raw and not raw.isspace():
+				safe = self._processText(raw)
+				anyText = True
+			else:
+				safe = b""
+			# Hand the list to the block and start a new one rather than
+			# copying it.
+			blocks.append((safe, pendingIndexes, curPitchOffset))
+			allIndexes.extend(pendingIndexes)
+			pendingIndexes = []
 
 		for item in speechSequence:
 			if isinstance(item, str):
@@ -238,10 +380,8 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		while blocks and not blocks[-1][0] and not blocks[-1][1]:
 			blocks.pop()
 
-		anyText = any(bool(t) for (t, _, __) in blocks)
-		allIndexes = []
-		for (_, idxs, __) in blocks:
-			allIndexes.extend(idxs)
+		# Trailing blocks dropped above had neither text nor indexes, so
+		# anyText/allIndexes gathered in flush() are still exact.
 		return blocks, anyText, allIndexes
 
 	def _notifyIndexesAndDone(self, indexes):
@@ -254,32 +394,29 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		self._speakGeneration += 1
 		gen = self._speakGeneration
 		self.speaking = True
-		basePitch = self._basePitch
-		lastPitch = None
+		pitchTable = self._pitchTable
 
+		# One wrapper call for the whole utterance; the wrapper applies each
+		# segment's pitch and restores the base pitch afterwards.
+		segments = []
 		for (text, indexesAfter, pitchOffset) in blocks:
-			if not self.speaking:
-				break
 			# Apply pitch offset for capital letter distinction
-			pitch = max(0, min(100, int(basePitch + basePitch * pitchOffset / 100))) if pitchOffset else basePitch
-			if pitch != lastPitch:
-				self.setVParam(_oldeloq.PITCH, pitch)
-				lastPitch = pitch
-			if text:
-				if not _oldeloq.speak(text):
-					self.speaking = False
-					break
-			if self.speaking and indexesAfter:
+			pitch = pitchTable.get(pitchOffset)
+			if pitch is None:
+				pitch = _offset_pitch(self._basePitch, pitchOffset)
+			onReached = None
+			if indexesAfter:
 				def cb(idxs=indexesAfter, g=gen):
 					if self._speakGeneration == g:
 						for i in idxs:
 							synthDriverHandler.synthIndexReached.notify(
 								synth=self, index=i)
-				_oldeloq.feed_marker(on_done=cb)
+				# Queue behind the segment's audio so indexes fire on playback.
+				onReached = functools.partial(_oldeloq.feed_marker, on_done=cb)
+			segments.append((text, pitch, onReached))
 
-		# Restore base pitch
-		if lastPitch != basePitch:
-			self.setVParam(_oldeloq.PITCH, basePitch)
+		if not _oldeloq.speak_batch(segments):
+			self.speaking = False
 
 		if not self.speaking:
 			synthDriverHandler.synthDoneSpeaking.notify(synth=self)
@@ -294,47 +431,16 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		_oldeloq.player_idle()
 
 	def _processText(self, text):
-		"""Apply ECI text preprocessing: anticrash, volume, pauses, etc."""
+		"""Apply ECI text preprocessing and return the cp1252 bytes to speak."""
 		if not text:
-			return ""
-		text = text.encode('windows-1252', 'replace').decode('windows-1252', 'replace')
-		text = _resub(anticrash_res, text)
-
-		# Inline volume + sanitize backticks in user text
-		vlm = self.getVParam(_oldeloq.VLM)
-		text = " `vv%d %s" % (vlm, text.replace('`', ' '))
-
-		# Fix times
-		text = time_re.sub(r'\1:\2 \3', text)
-
-		# Abbreviation dictionary
-		if self._ABRDICT:
-			text = "`da1 " + text
-		else:
-			text = "`da0 " + text
-
-		# Shorten pauses
-		if self._pause_mode == 2:
-			text = pause_re.sub(r'\1 `p1\2\3', text)
-		elif self._pause_mode == 1:
-			if re.search(r'[.(),:;!?]$', text.strip()):
-				text = re.sub(r'([.(),:;!?])$', r' `p1\1', text.strip())
-
-		if not text.strip().endswith('`p2'):
-			text += ' `p2'
-
-		return text
+			return b""
+		# Short strings (labels, characters, cursor moves) repeat constantly;
+		# long say-all text rarely does and would only churn the cache.
+		process = _process_text_cached if len(text) <= _CACHED_TEXT_LEN else _process_text
+		return process(text, self._volume, bool(self._ABRDICT), self._pause_mode)
 
 	# --- Settings ---
 
-	def _percentToParam(self, val, minVal, maxVal):
-		return int(round(minVal + (maxVal - minVal) * float(val) / 100.0))
-
-	def _paramToPercent(self, val, minVal, maxVal):
-		if maxVal == minVal:
-			return 0
-		return int(round(100.0 * float(val - minVal) / float(maxVal - minVal)))
-
 	def getVParam(self, pr):
 		v = _oldeloq.dll_call("eloq_get_vparam", pr)
 		return v if v is not None and v >= 0 else 0
@@ -343,12 +449,14 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		_oldeloq.dll_call("eloq_set_vparam", int(pr), int(vl))
 
 	# Rate
+	# ECI rate is already 0-100, the same scale as NVDA's percentage, so the
+	# stored setting is the engine value; __init__ sets it before NVDA reads it.
 	def _get_rate(self):
-		return self._paramToPercent(self.getVParam(_oldeloq.RATE), minRate, maxRate)
+		return self._rate
 
 	def _set_rate(self, vl):
-		self._rate = self._percentToParam(vl, minRate, maxRate)
-		self.setVParam(_oldeloq.RATE, self._rate)
+		self._rate = int(round(vl))
+		self.setVParam(self._RATE, self._rate)
 
 	# Rate Boost — 2x speed via Sonic time-stretching (no pitch change)
 	def _get_rateBoost(self):
@@ -364,49 +472,55 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 
 	def _set_pitch(self, vl):
 		self._basePitch = int(vl)
-		self.setVParam(_oldeloq.PITCH, int(vl))
+		self.setVParam(self._PITCH, self._basePitch)
+		self._buildPitchTable()
+
+	def _buildPitchTable(self):
+		# Precomputed per base pitch so _speakBg does a lookup per block.
+		basePitch = self._basePitch
+		self._pitchTable = {off: _offset_pitch(basePitch, off) for off in _PITCH_OFFSETS}
 
 	# Volume
 	def _get_volume(self):
-		return self.getVParam(_oldeloq.VLM)
+		return self._volume
 
 	def _set_volume(self, vl):
-		self.setVParam(_oldeloq.VLM, int(vl))
+		self._volume = int(vl)
+		self.setVParam(self._VLM, self._volume)
 
 	# Inflection
 	def _get_inflection(self):
-		return self.getVParam(_oldeloq.FLUCTUATION)
+		return self.getVParam(self._FLUCTUATION)
 
 	def _set_inflection(self, vl):
-		self.setVParam(_oldeloq.FLUCTUATION, int(vl))
+		self.setVParam(self._FLUCTUATION, int(vl))
 
 	# Head Size
 	def _get_hsz(self):
-		return self.getVParam(_oldeloq.HSZ)
+		return self.getVParam(self._HSZ)
 
 	def _set_hsz(self, vl):
-		self.setVParam(_oldeloq.HSZ, int(vl))
+		self.setVParam(self._HSZ, int(vl))
 
 	# Roughness
 	def _get_rgh(self):
-		return self.getVParam(_oldeloq.RGH)
+		return self.getVParam(self._RGH)
 
 	def _set_rgh(self, vl):
-		self.setVParam(_oldeloq.RGH, int(vl))
+		self.setVParam(self._RGH, int(vl))
 
 	# Breathiness
 	def _get_bth(self):
-		return self.getVParam(_oldeloq.BTH)
+		return self.getVParam(self._BTH)
 
 	def _set_bth(self, vl):
-		self.setVParam(_oldeloq.BTH, int(vl))
+		self.setVParam(self._BTH, int(vl))
 
 	# Voice (language)
 	def _getAvailableVoices(self):
 		o = OrderedDict()
-		engine_dir = os.path.join(os.path.dirname(__file__), "eloquence")
-		if os.path.isdir(engine_dir):
-			for name in os.listdir(engine_dir):
+		if os.path.isdir(_ENGINE_DIR):
+			for name in os.listdir(_ENGINE_DIR):
 				if not name.lower().endswith('.syn'):
 					continue
 				lname = name.lower()[:-4]
@@ -433,10 +547,7 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 
 	# Variant
 	def _getAvailableVariants(self):
-		return OrderedDict(
-			(str(k), VoiceInfo(str(k), name))
-			for k, name in variants.items()
-		)
+		return _VARIANTS
 
 	def _get_variant(self):
 		return self._variant
@@ -449,10 +560,11 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 		if vv not in variants:
 			vv = 1
 		self._variant = str(vv)
-		_oldeloq.dll_call("eloq_set_variant", vv)
-		# Re-apply rate after variant change
-		if hasattr(self, '_rate'):
-			self.setVParam(_oldeloq.RATE, self._rate)
+		# The variant copy resets voice params, so re-apply rate and pitch in
+		# the same call (-1 = leave unchanged). Speech only sends pitch for
+		# shifted segments, so without this the engine would keep the
+		# variant's default pitch.
+		_oldeloq.dll_call("eloq_apply_state", getattr(self, '_rate', -1), self._basePitch, -1, vv)
 
 	# Abbreviation dictionary
 	def _get_ABRDICT(self):
@@ -463,11 +575,7 @@ class SynthDriver(synthDriverHandler.SynthDriver):
 
 	# Pause mode
 	def _get_availablePausemodes(self):
-		return {
-			"0": StringParameterInfo("0", "Do not shorten"),
-			"1": StringParameterInfo("1", "Shorten final punctuation"),
-			"2": StringParameterInfo("2", "Shorten all punctuation"),
-		}
+		return _PAUSE_MODES
 
 	def _get_pauseMode(self):
 		return str(self._pause_mode)
@@ -492,7 +600,7 @@ if _ctypes.sizeof(_ctypes.c_void_p) == 8:
 	class SynthDriver(_Proxy32):
 		name = "oldeloquence"
 		description = "Old ETI-Eloquence"
-		synthDriver32Path = os.path.dirname(__file__)
+		synthDriver32Path = _ADDON_DIR
 		synthDriver32Name = "oldeloquence"
 
 		_BRIDGE_SAFE = frozenset({"voice", "variant", "rate", "pitch", "volume", "rateBoost"})
@@ -504,8 +612,7 @@ if _ctypes.sizeof(_ctypes.c_void_p) == 8:
 		def check(cls):
 			if not super().check():
 				return False
-			base = os.path.dirname(__file__)
 			return (
-				os.path.isfile(os.path.join(base, "eloquence_wrapper.dll"))
-				and os.path.isfile(os.path.join(base, "eloquence", "eci32d.dll"))
+				os.path.isfile(os.path.join(_ADDON_DIR, "eloquence_wrapper.dll"))
+				and os.path.isfile(os.path.join(_ENGINE_DIR, "eci32d.dll"))
 			)
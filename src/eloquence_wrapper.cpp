@@ -146,10 +146,16 @@ struct StreamItem {
 // ------------------------------------------------------------
 // Command queue
 // ------------------------------------------------------------
+struct Segment {
+    std::string text;  // MBCS-encoded
+    int pitch = -1;    // voice param 2 for this segment; -1 = base pitch
+    int marker = -1;   // pushed as ELOQ_ITEM_INDEX once synthesized; -1 = none
+};
+
 struct Cmd {
     enum Type { CMD_SPEAK, CMD_QUIT } type = CMD_SPEAK;
     uint32_t cancelSnapshot = 0;
-    std::string text; // MBCS-encoded
+    std::vector<Segment> segments; // one for eloq_speak, N for eloq_speak_batch
 };
 
 // ------------------------------------------------------------
@@ -224,6 +230,7 @@ struct ELOQ_STATE {
     HANDLE stopEvent = nullptr;
     HANDLE cmdEvent = nullptr;
     HANDLE initEvent = nullptr;
+    HANDLE outEvent = nullptr; // manual-reset; set when outQ gains an item or readers must wake
     std::atomic<int> initOk{ 0 };
 
     // Cancel + generations
@@ -256,12 +263,13 @@ struct ELOQ_STATE {
     std::deque<Cmd> cmdQ;
     std::thread worker;
 
-    // Output queue
+    // Output queue. Not capped: the reader may block in the player for the
+    // rest of playback, so the queue can hold up to one generation's audio
+    // (a whole utterance). Every CMD_SPEAK and eloq_stop clear it, so it
+    // never holds more than that.
     std::mutex outMtx;
     std::deque<StreamItem> outQ;
     size_t queuedAudioBytes = 0;
-    size_t maxBufferedBytes = 4 * 1024 * 1024;
-    size_t maxQueueItems = 8192;
 };
 
 static ELOQ_STATE* g_state = nullptr;
@@ -426,28 +434,13 @@ static void pushAudioToQueue(ELOQ_STATE* s, uint32_t gen, std::vector<uint8_t> b
     const uint32_t curGen = s->currentGen.load(std::memory_order_relaxed);
     if (curGen == 0 || gen != curGen) return;
 
-    const size_t limit = s->maxBufferedBytes;
-    // Drop oldest audio if full.
-    while ((s->queuedAudioBytes + buf.size() > limit) || (s->outQ.size() >= s->maxQueueItems)) {
-        bool found = false;
-        for (auto it = s->outQ.begin(); it != s->outQ.end(); ++it) {
-            if (it->type == ELOQ_ITEM_AUDIO) {
-                size_t remaining = (it->data.size() > it->offset) ? (it->data.size() - it->offset) : 0;
-                if (s->queuedAudioBytes >= remaining) s->queuedAudioBytes -= remaining;
-                else s->queuedAudioBytes = 0;
-                s->outQ.erase(it);
-                found = true;
-                break;
-            }
-        }
-        if (!found) return;
-    }
-
+    // Never drop current-generation audio; see the outQ comment.
     const size_t bufSize = buf.size();
     StreamItem it(ELOQ_ITEM_AUDIO, 0, gen);
     it.data = std::move(buf);
     s->queuedAudioBytes += bufSize;
     s->outQ.push_back(std::move(it));
+    SetEvent(s->outEvent);
 }
 
 static void pushMarker(ELOQ_STATE* s, int type, int value, uint32_t gen) {
@@ -455,6 +448,7 @@ static void pushMarker(ELOQ_STATE* s, int type, int value, uint32_t gen) {
     const uint32_t curGen = s->currentGen.load(std::memory_order_relaxed);
     if (curGen == 0 || gen != curGen) return;
     s->outQ.push_back(StreamItem(type, value, gen));
+    SetEvent(s->outEvent);
 }
 
 // ------------------------------------------------------------
@@ -1009,79 +1003,17 @@ static void workerLoop(ELOQ_STATE* s) {
         }
     };
 
-    while (true) {
-        pumpMessages();
-
-        Cmd cmd;
-        bool hasCmd = false;
-        {
-            std::lock_guard<std::mutex> lk(s->cmdMtx);
-            if (!s->cmdQ.empty()) {
-                cmd = std::move(s->cmdQ.front());
-                s->cmdQ.pop_front();
-                hasCmd = true;
-            } else {
-                ResetEvent(s->cmdEvent);
-            }
-        }
-
-        if (!hasCmd) {
-            MsgWaitForMultipleObjectsEx(
-                1,
-                &s->cmdEvent,
-                INFINITE,
-                QS_ALLINPUT,
-                MWMO_INPUTAVAILABLE
-            );
-            continue;
-        }
-
-        if (cmd.type == Cmd::CMD_QUIT) {
-            dbg("worker: CMD_QUIT");
-            break;
-        }
-
-        // Check if this command was canceled before we process it.
-        const uint32_t snap = s->cancelToken.load(std::memory_order_relaxed);
-        dbg("worker: CMD_SPEAK snap=%u cmdSnap=%u text='%.80s'", snap, cmd.cancelSnapshot, cmd.text.c_str());
-        if (cmd.cancelSnapshot != snap) {
-            dbg("worker: command canceled (snap mismatch)");
-            continue;
-        }
-
-        const uint32_t gen = s->genCounter.fetch_add(1, std::memory_order_relaxed);
-        dbg("worker: gen=%u", gen);
-
-        ResetEvent(s->stopEvent);
+    // Synthesize one piece of text under gen and wait for the engine to
+    // finish it. Returns false if it was stopped or canceled.
+    auto synthesizeText = [&](std::string& text, uint32_t gen, uint32_t snap) -> bool {
         ResetEvent(s->doneEvent);
         s->silenceSamples = 0;
 
-        // Gate on.
-        s->currentGen.store(gen, std::memory_order_relaxed);
-        s->activeGen.store(gen, std::memory_order_relaxed);
-
-        // Clear output queue.
-        {
-            std::lock_guard<std::mutex> g(s->outMtx);
-            clearOutputQueueLocked(s);
-        }
-
-        // Apply pending settings.
-        applyDirtySettings(s);
-
-        // Send text.
-        if (cmd.text.empty()) {
-            dbg("worker: empty text, pushing DONE");
-            s->activeGen.store(0, std::memory_order_relaxed);
-            pushMarker(s, ELOQ_ITEM_DONE, 0, gen);
-            continue;
-        }
-
         // Strip brackets/parens for all modes — Eloquence reads them as
         // full words (e.g. "LEFT PAREN LEFT PARENTHESIS").
         // Backtick only stripped for mode 20; mode 33 uses it as ECI
         // inline command prefix (e.g. `da0, `vv92).
-        for (auto& ch : cmd.text) {
+        for (auto& ch : text) {
             switch (ch) {
                 case '(': case ')':
                 case '{': case '}':
@@ -1095,7 +1027,7 @@ static void workerLoop(ELOQ_STATE* s) {
         }
 
         dbg("worker: fnAddText...");
-        int addRc = s->fnAddText(s->handle, cmd.text.c_str());
+        int addRc = s->fnAddText(s->handle, text.c_str());
         dbg("worker: fnAddText returned %d", addRc);
         dbg("worker: fnSynthesize...");
         int synRc = s->fnSynthesize(s->handle);
@@ -1144,12 +1076,14 @@ static void workerLoop(ELOQ_STATE* s) {
             }
         }
 
-        if (stopped || s->cancelToken.load(std::memory_order_relaxed) != snap) {
+        const bool canceled = s->cancelToken.load(std::memory_order_relaxed) != snap;
+        if (stopped || canceled) {
             dbg("worker: calling fnStop (stopped=%d)", stopped);
             if (s->fnStop) s->fnStop(s->handle);
         }
 
-        // Flush sonic stream to get any remaining buffered audio.
+        // Flush sonic stream to get any remaining buffered audio, so a
+        // segment's marker follows all of its audio.
         if (s->sonicStream && s->rateBoost > 1.001f && s->formatValid) {
             sonicFlushStream(s->sonicStream);
             const int bps = s->lastFormat.wBitsPerSample;
@@ -1166,6 +1100,88 @@ static void workerLoop(ELOQ_STATE* s) {
             }
         }
 
+        return !stopped && !canceled;
+    };
+
+    while (true) {
+        pumpMessages();
+
+        Cmd cmd;
+        bool hasCmd = false;
+        {
+            std::lock_guard<std::mutex> lk(s->cmdMtx);
+            if (!s->cmdQ.empty()) {
+                cmd = std::move(s->cmdQ.front());
+                s->cmdQ.pop_front();
+                hasCmd = true;
+            } else {
+                ResetEvent(s->cmdEvent);
+            }
+        }
+
+        if (!hasCmd) {
+            MsgWaitForMultipleObjectsEx(
+                1,
+                &s->cmdEvent,
+                INFINITE,
+                QS_ALLINPUT,
+                MWMO_INPUTAVAILABLE
+            );
+            continue;
+        }
+
+        if (cmd.type == Cmd::CMD_QUIT) {
+            dbg("worker: CMD_QUIT");
+            break;
+        }
+
+        // Check if this command was canceled before we process it.
+        const uint32_t snap = s->cancelToken.load(std::memory_order_relaxed);
+        dbg("worker: CMD_SPEAK snap=%u cmdSnap=%u segments=%zu", snap, cmd.cancelSnapshot, cmd.segments.size());
+        if (cmd.cancelSnapshot != snap) {
+            dbg("worker: command canceled (snap mismatch)");
+            continue;
+        }
+
+        const uint32_t gen = s->genCounter.fetch_add(1, std::memory_order_relaxed);
+        dbg("worker: gen=%u", gen);
+
+        ResetEvent(s->stopEvent);
+
+        // Gate on.
+        s->currentGen.store(gen, std::memory_order_relaxed);
+        s->activeGen.store(gen, std::memory_order_relaxed);
+
+        // Clear output queue.
+        {
+            std::lock_guard<std::mutex> g(s->outMtx);
+            clearOutputQueueLocked(s);
+        }
+
+        // Apply pending settings.
+        applyDirtySettings(s);
+
+        // Segments share one generation: audio, per-segment INDEX markers
+        // and the final DONE all land in the same output stream.
+        const int basePitch = s->vparams[2].value.load(std::memory_order_relaxed);
+        int appliedPitch = basePitch;
+        for (auto& seg : cmd.segments) {
+            if (s->cancelToken.load(std::memory_order_relaxed) != snap) break;
+
+            const int wantPitch = seg.pitch >= 0 ? seg.pitch : basePitch;
+            if (wantPitch != appliedPitch && s->fnSetVoiceParam) {
+                s->fnSetVoiceParam(s->handle, 0, 2, wantPitch);
+                appliedPitch = wantPitch;
+            }
+
+            if (!seg.text.empty() && !synthesizeText(seg.text, gen, snap)) break;
+
+            if (seg.marker >= 0)
+                pushMarker(s, ELOQ_ITEM_INDEX, seg.marker, gen);
+        }
+        if (appliedPitch != basePitch && s->fnSetVoiceParam)
+            s->fnSetVoiceParam(s->handle, 0, 2, basePitch);
+
         s->activeGen.store(0, std::memory_order_relaxed);
         pushMarker(s, ELOQ_ITEM_DONE, 0, gen);
         dbg("worker: pushed DONE marker, currentGen=%u", s->currentGen.load(std::memory_order_relaxed));
@@ -1202,6 +1218,7 @@ extern "C" ELOQ_API int __cdecl eloq_init(const wchar_t* dllDir) {
     s->stopEvent = CreateEventW(nullptr, TRUE, FALSE, nullptr);
     s->cmdEvent  = CreateEventW(nullptr, TRUE, FALSE, nullptr);
     s->initEvent = CreateEventW(nullptr, TRUE, FALSE, nullptr);
+    s->outEvent  = CreateEventW(nullptr, TRUE, FALSE, nullptr);
 
     g_state = s;
 
@@ -1226,6 +1243,7 @@ extern "C" ELOQ_API int __cdecl eloq_init(const wchar_t* dllDir) {
         if (s->stopEvent) CloseHandle(s->stopEvent);
         if (s->cmdEvent) CloseHandle(s->cmdEvent);
         if (s->initEvent) CloseHandle(s->initEvent);
+        if (s->outEvent) CloseHandle(s->outEvent);
         delete s;
         g_state = nullptr;
         return -3;
@@ -1261,6 +1279,7 @@ extern "C" ELOQ_API void __cdecl eloq_free(void) {
     if (s->stopEvent) CloseHandle(s->stopEvent);
     if (s->cmdEvent) CloseHandle(s->cmdEvent);
     if (s->initEvent) CloseHandle(s->initEvent);
+    if (s->outEvent) CloseHandle(s->outEvent);
 
     g_state = nullptr;
     delete s;
@@ -1295,7 +1314,8 @@ extern "C" ELOQ_API int __cdecl eloq_speak(const char* text) {
     Cmd cmd;
     cmd.type = Cmd::CMD_SPEAK;
     cmd.cancelSnapshot = s->cancelToken.load(std::memory_order_relaxed);
-    cmd.text = text;
+    cmd.segments.resize(1);
+    cmd.segments[0].text = text;
 
     dbg("eloq_speak: cancelToken=%u cmdSnap=%u", newCancel, cmd.cancelSnapshot);
 
@@ -1307,6 +1327,39 @@ extern "C" ELOQ_API int __cdecl eloq_speak(const char* text) {
     return 0;
 }
 
+// Speak several segments as one utterance. Each segment may override the
+// pitch (pitches[i] >= 0; the base pitch is restored afterwards) and may
+// carry a marker (markers[i] >= 0), pushed as ELOQ_ITEM_INDEX once all of
+// that segment's audio is queued. pitches/markers may be NULL.
+extern "C" ELOQ_API int __cdecl eloq_speak_batch(const char* const* texts, const int* pitches, const int* markers, int count) {
+    ELOQ_STATE* s = g_state;
+    if (!s || !texts || count <= 0) return -1;
+
+    dbg("eloq_speak_batch: %d segments", count);
+
+    // Cancel any previous utterance.
+    s->cancelToken.fetch_add(1, std::memory_order_relaxed);
+    SetEvent(s->stopEvent);
+
+    Cmd cmd;
+    cmd.type = Cmd::CMD_SPEAK;
+    cmd.cancelSnapshot = s->cancelToken.load(std::memory_order_relaxed);
+    cmd.segments.resize((size_t)count);
+    for (int i = 0; i < count; i++) {
+        Segment& seg = cmd.segments[(size_t)i];
+        if (texts[i]) seg.text = texts[i];
+        if (pitches) seg.pitch = pitches[i];
+        if (markers) seg.marker = markers[i];
+    }
+
+    {
+        std::lock_guard<std::mutex> lk(s->cmdMtx);
+        s->cmdQ.push_back(std::move(cmd));
+        SetEvent(s->cmdEvent);
+    }
+    return 0;
+}
+
 extern "C" ELOQ_API int __cdecl eloq_stop(void) {
     ELOQ_STATE* s = g_state;
     if (!s) return -1;
@@ -1329,18 +1382,14 @@ extern "C" ELOQ_API int __cdecl eloq_stop(void) {
     s->currentGen.store(0, std::memory_order_relaxed);
     s->activeGen.store(0, std::memory_order_relaxed);
 
+    // Wake any reader blocked in eloq_read_wait.
+    SetEvent(s->outEvent);
+
     return 0;
 }
 
-extern "C" ELOQ_API int __cdecl eloq_read(void* buf, int maxBytes, int* itemType, int* value) {
-    if (itemType) *itemType = ELOQ_ITEM_NONE;
-    if (value) *value = 0;
-
-    ELOQ_STATE* s = g_state;
-    if (!s || !buf || maxBytes < 0) return 0;
-
-    std::lock_guard<std::mutex> g(s->outMtx);
-
+// Pop the next stream item into buf/itemType/value. Caller holds outMtx.
+static int readStreamItemLocked(ELOQ_STATE* s, void* buf, int maxBytes, int* itemType, int* value) {
     const uint32_t curGen = s->currentGen.load(std::memory_order_relaxed);
     if (curGen == 0) {
         static int readZeroCount = 0;
@@ -1367,20 +1416,30 @@ extern "C" ELOQ_API int __cdecl eloq_read(void* buf, int maxBytes, int* itemType
     if (value) *value = front.value;
 
     if (front.type == ELOQ_ITEM_AUDIO) {
-        size_t remainingSz = (front.data.size() > front.offset) ? (front.data.size() - front.offset) : 0;
-        int n = (remainingSz > (size_t)maxBytes) ? maxBytes : (int)remainingSz;
-
-        if (n > 0) {
-            std::memcpy(buf, front.data.data() + front.offset, (size_t)n);
-            front.offset += (size_t)n;
-            if (s->queuedAudioBytes >= (size_t)n) s->queuedAudioBytes -= (size_t)n;
-            else s->queuedAudioBytes = 0;
-        }
+        // Drain consecutive audio items so one call returns as much
+        // contiguous audio as fits, instead of one engine slice per call.
+        uint8_t* dst = static_cast<uint8_t*>(buf);
+        int total = 0;
+        while (!s->outQ.empty()) {
+            StreamItem& it = s->outQ.front();
+            if (it.type != ELOQ_ITEM_AUDIO || it.gen != curGen) break;
+
+            size_t remainingSz = (it.data.size() > it.offset) ? (it.data.size() - it.offset) : 0;
+            const int room = maxBytes - total;
+            int n = (remainingSz > (size_t)room) ? room : (int)remainingSz;
+
+            if (n > 0) {
+                std::memcpy(dst + total, it.data.data() + it.offset, (size_t)n);
+                it.offset += (size_t)n;
+                total += n;
+                if (s->queuedAudioBytes >= (size_t)n) s->queuedAudioBytes -= (size_t)n;
+                else s->queuedAudioBytes = 0;
+            }
 
-        if (front.offset >= front.data.size()) {
+            if (it.offset < it.data.size()) break; // buf is full
             s->outQ.pop_front();
         }
-        return n;
+        return total;
     }
 
     // DONE / INDEX / ERROR: consume and return.
@@ -1388,6 +1447,48 @@ extern "C" ELOQ_API int __cdecl eloq_read(void* buf, int maxBytes, int* itemType
     return 0;
 }
 
+extern "C" ELOQ_API int __cdecl eloq_read(void* buf, int maxBytes, int* itemType, int* value) {
+    if (itemType) *itemType = ELOQ_ITEM_NONE;
+    if (value) *value = 0;
+
+    ELOQ_STATE* s = g_state;
+    if (!s || !buf || maxBytes < 0) return 0;
+
+    std::lock_guard<std::mutex> g(s->outMtx);
+    return readStreamItemLocked(s, buf, maxBytes, itemType, value);
+}
+
+// Like eloq_read, but blocks until an item is available, eloq_stop is
+// called, or timeoutMs elapses (returns ELOQ_ITEM_NONE in the latter cases).
+extern "C" ELOQ_API int __cdecl eloq_read_wait(void* buf, int maxBytes, int* itemType, int* value, int timeoutMs) {
+    if (itemType) *itemType = ELOQ_ITEM_NONE;
+    if (value) *value = 0;
+
+    ELOQ_STATE* s = g_state;
+    if (!s || !buf || maxBytes < 0) return 0;
+
+    const uint32_t snap = s->cancelToken.load(std::memory_order_relaxed);
+    const DWORD deadline = GetTickCount() + (DWORD)(timeoutMs > 0 ? timeoutMs : 0);
+    while (true) {
+        {
+            std::lock_guard<std::mutex> g(s->outMtx);
+            int type = ELOQ_ITEM_NONE;
+            int n = readStreamItemLocked(s, buf, maxBytes, &type, value);
+            if (type != ELOQ_ITEM_NONE) {
+                if (itemType) *itemType = type;
+                return n;
+            }
+            // Queue is empty; producers set the event again on the next push.
+            ResetEvent(s->outEvent);
+        }
+        if (s->cancelToken.load(std::memory_order_relaxed) != snap) return 0;
+
+        DWORD remaining = deadline - GetTickCount();
+        if ((int)remaining <= 0) return 0;
+        if (WaitForSingleObject(s->outEvent, remaining) != WAIT_OBJECT_0) return 0;
+    }
+}
+
 extern "C" ELOQ_API int __cdecl eloq_set_variant(int variant) {
     ELOQ_STATE* s = g_state;
     if (!s) return -1;
@@ -1410,6 +1511,26 @@ extern "C" ELOQ_API int __cdecl eloq_get_vparam(int param) {
     return s->vparams[param].value.load(std::memory_order_relaxed);
 }
 
+// Set rate, pitch, volume and variant in one call; -1 leaves a field as is.
+// Like the single setters this only marks state dirty: applyDirtySettings()
+// copies the variant first and then the voice params, so a rate passed with
+// a variant change survives the eciCopyVoice reset.
+extern "C" ELOQ_API int __cdecl eloq_apply_state(int rate, int pitch, int volume, int variant) {
+    ELOQ_STATE* s = g_state;
+    if (!s) return -1;
+    if (variant >= 0) {
+        s->variant.value.store(variant, std::memory_order_relaxed);
+        s->variant.dirty.store(1, std::memory_order_relaxed);
+    }
+    const int params[3][2] = { { 6, rate }, { 2, pitch }, { 7, volume } };
+    for (const auto& p : params) {
+        if (p[1] < 0) continue;
+        s->vparams[p[0]].value.store(p[1], std::memory_order_relaxed);
+        s->vparams[p[0]].dirty.store(1, std::memory_order_relaxed);
+    }
+    return 0;
+}
+
 extern "C" ELOQ_API int __cdecl eloq_set_voice(int voiceId) {
     ELOQ_STATE* s = g_state;
     if (!s) return -1;